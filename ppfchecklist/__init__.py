@@ -5,6 +5,7 @@ from datetime import datetime
 from json import load
 from os import getenv
 from os.path import join
+from queue import Empty, Full, Queue
 from sys import maxsize, stdout
 
 from dotenv import load_dotenv
@@ -65,7 +66,14 @@ def get_ip(req: request) -> str:
 def close_connection(exception):
     db = getattr(g, "_database", None)
     if db is not None:
-        db.close()
+        if _pool_size <= 0 or db.connection.in_transaction:
+            # closing rolls an open transaction back, pooled it would keep the lock
+            db.close()
+            return
+        try:
+            _pool.put_nowait(db)
+        except Full:
+            db.close()
 
 
 @app.route("/favicon.ico")
@@ -177,10 +185,20 @@ def unknown(unknown: str):
     return redirect(redirect_url)
 
 
+# idle connections kept between requests, so each one skips the connect setup
+_pool_size = getenv_int("PPF_POOL_SIZE", 4)
+_pool = Queue(maxsize=max(_pool_size, 1))
+
+
 def get_db():
     db = getattr(g, "_database", None)
     if db is None:
-        db = g._database = DatabaseSqlite3(getenv("PPF_BASEDIR", "."))
+        try:
+            db = _pool.get_nowait()
+        except Empty:
+            db = DatabaseSqlite3(getenv("PPF_BASEDIR", "."))
+        db.refresh()
+        g._database = db
     return db
 
 
@@ -1,14 +1,122 @@
 """Database for the lists"""
 import logging
 import sqlite3
+import threading
 from abc import ABC, abstractmethod
-from more_itertools import partition
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import groupby
 from json import dumps, load
+from operator import itemgetter
 from os import getenv
 from os.path import join
 from sys import maxsize
 from typing import Union
 
+_SCHEMA = (
+    """
+CREATE TABLE IF NOT EXISTS Status (
+    name TEXT,
+    position INT,
+    orderByPosition INT
+)
+""",
+    """
+CREATE TABLE IF NOT EXISTS List (
+    name TEXT,
+    position INT,
+    active INT
+)
+""",
+    """
+CREATE TABLE IF NOT EXISTS ListStatus (
+    list INT,
+    status INT,
+    FOREIGN KEY (list) REFERENCES List(rowid),
+    FOREIGN KEY (status) REFERENCES Status(rowid),
+    UNIQUE (list, status)
+)
+""",
+    """
+CREATE TABLE IF NOT EXISTS Entry (
+    name TEXT NOT NULL,
+    position INTEGER,
+    date TEXT,
+    status INT,
+    list INT,
+    FOREIGN KEY (status) REFERENCES Status(rowid),
+    FOREIGN KEY (list) REFERENCES List(rowid),
+    UNIQUE(position,date,name,status,list)
+)
+""",
+    """
+-- covers info(), the position shifts and the MAX(position) clamp
+CREATE INDEX IF NOT EXISTS idx_entry_list_status_pos
+ON Entry(list, status, position, date, name)
+""",
+    """
+CREATE INDEX IF NOT EXISTS idx_list_active_pos
+ON List(active, position)
+""",
+    """
+-- table() and is_table() look lists up by name, settings can repeat a name
+CREATE INDEX IF NOT EXISTS idx_list_name
+ON List(name)
+""",
+)
+
+# checkouts between PRAGMA optimize runs on a pooled connection
+_OPTIMIZE_EVERY = 1000
+
+_SCHEMA_OBJECTS = frozenset(
+    {
+        "Status",
+        "List",
+        "ListStatus",
+        "Entry",
+        "idx_entry_list_status_pos",
+        "idx_list_active_pos",
+        "idx_list_name",
+    }
+)
+
+
+# kept as module constants so every call hands the statement cache the same string
+_SQL_INCREMENT = """
+UPDATE Entry
+SET position = position + 1
+WHERE list = ? AND status = ? AND position >= ?
+"""
+
+_SQL_DECREMENT = """
+UPDATE Entry
+SET position = position - 1
+WHERE list = ? AND status = ? AND position > ?
+"""
+
+_SQL_CALC_POS = """
+SELECT COALESCE(MAX(position), 0)
+FROM Entry
+WHERE list = ? AND status = ?
+"""
+
+_SQL_UPDATE_ENTRY = """
+UPDATE Entry
+SET
+    position = CASE WHEN rowid = ? THEN ? ELSE position + ? END,
+    name = CASE WHEN rowid = ? THEN ? ELSE name END,
+    date = CASE WHEN rowid = ? THEN ? ELSE date END
+WHERE rowid = ?
+    OR (list = ? AND status = ? AND position BETWEEN ? AND ?)
+"""
+
+_SQL_INSERT_ENTRY = """
+INSERT INTO Entry
+SELECT ?, MIN(?, COALESCE(MAX(position), 0) + 1), ?, ?, ?
+FROM Entry
+WHERE list = ? AND status = ?
+"""
+
 
 class TableNotFoundError(Exception):
     """Custom exception when table in database isn't found"""
@@ -54,78 +162,67 @@ class DatabaseSqlite3(Database):
         _filename = kwargs.get("filename") or getenv("PPF_DATABASE", "list.db")
         _fullpath = join(_basedir, _filename)
 
-        self.connection = sqlite3.connect(_fullpath)
+        self.connection = sqlite3.connect(
+            _fullpath,
+            isolation_level=None,
+            cached_statements=256,
+            check_same_thread=False,
+        )
         self.connection.row_factory = sqlite3.Row
+        # shared across threads, a transaction holds it from BEGIN to COMMIT
+        self._lock = threading.RLock()
+        self._cursor = self.connection.cursor()
+        # WAL lets reads run alongside a write. With synchronous NORMAL a commit
+        # no longer waits on fsync, the WAL is only synced at checkpoints: a
+        # power loss or OS crash can roll back the last few commits, but the
+        # file never corrupts and an application crash loses nothing.
+        for pragma in (
+            "journal_mode = WAL",
+            "synchronous = NORMAL",
+            "temp_store = MEMORY",
+            "mmap_size = 268435456",
+            "cache_size = -64000",
+            "busy_timeout = 5000",
+        ):
+            self._cursor.execute(f"PRAGMA {pragma}")
+
+        self._tables_cache = None
+        # every list shares the Status rows, so they are cached once
+        self._status_cache = None
+        self._status_by_id = {}
+        self._table_cache = {}
+        self._data_version = None
+        self._checkouts = 0
 
         self._init_database()
+        # pooled connections live for many requests, so optimize runs at open
+        # and every _OPTIMIZE_EVERY checkouts as well as at close
+        self._cursor.execute("PRAGMA optimize = 0x10002")
 
     def _init_database(self):
-        try:
-            self._execute(
-                """CREATE TABLE Status (
-                    name TEXT,
-                    position INT,
-                    orderByPosition INT
-                )"""
+        existing = {
+            row["name"]
+            for row in self._query(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'index')"
             )
-        except sqlite3.OperationalError as e:
-            if "already exists" not in str(e):
-                logging.debug(e)
+        }
+        if _SCHEMA_OBJECTS <= existing:
+            self._analyze(existing)
+            return
+
+        if self.connection.in_transaction:
+            # executescript would commit the caller's transaction first
+            for statement in _SCHEMA:
+                self._execute(statement)
+        else:
+            with self._lock:
+                script = ";\n".join(("BEGIN", *_SCHEMA, "COMMIT"))
+                self.connection.executescript(f"{script};")
+        self._analyze(existing)
 
-        try:
-            self._execute(
-                """CREATE TABLE List (
-                    name TEXT,
-                    position INT,
-                    active INT
-                )"""
-            )
-        except sqlite3.OperationalError as e:
-            if "already exists" not in str(e):
-                logging.debug(e)
-
-        try:
-            self._execute(
-                """CREATE TABLE ListStatus (
-                    list INT,
-                    status INT,
-                    FOREIGN KEY (list) REFERENCES List(rowid),
-                    FOREIGN KEY (status) REFERENCES Status(rowid),
-                    UNIQUE (list, status)
-                )"""
-            )
-        except sqlite3.OperationalError as e:
-            if "already exists" not in str(e):
-                logging.debug(e)
-
-        # tables = self._execute("SELECT rowid FROM List")
-        # statuses = self._execute("SELECT rowid FROM Status")
-        # for table in tables:
-        #     for status in statuses:
-        #         try:
-        #             self._execute(
-        #                 "INSERT INTO ListStatus VALUES (?,?,?)",
-        #                 (table["rowid"], status["rowid"], status["rowid"]),
-        #             )
-        #         except sqlite3.IntegrityError as e:
-        #             pass
-
-        try:
-            self._execute(
-                """CREATE TABLE Entry (
-                    name TEXT NOT NULL,
-                    position INTEGER,
-                    date TEXT,
-                    status INT,
-                    list INT,
-                    FOREIGN KEY (status) REFERENCES Status(rowid),
-                    FOREIGN KEY (list) REFERENCES List(rowid),
-                    UNIQUE(position,date,name,status,list)
-                )"""
-            )
-        except sqlite3.OperationalError as e:
-            if "already exists" not in str(e):
-                logging.debug(e)
+    def _analyze(self, existing: set):
+        if "sqlite_stat1" not in existing:
+            self._execute("ANALYZE")
 
     def _drop_database(self):
         logging.debug("Dropping tables")
@@ -135,81 +232,129 @@ class DatabaseSqlite3(Database):
         self._execute("DROP TABLE Status")
 
     def close(self):
-        self.connection.close()
+        with self._lock:
+            try:
+                self._cursor.execute("PRAGMA optimize")
+                self._cursor.close()
+            finally:
+                self.connection.close()
+
+    @contextmanager
+    def _txn(self):
+        """Group statements into one transaction, nested calls join the outer one"""
+        with self._lock:
+            if self.connection.in_transaction:
+                yield
+                return
+
+            self._cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+                self._cursor.execute("COMMIT")
+            except BaseException:
+                # a failed COMMIT leaves the transaction open, end it here too
+                if self.connection.in_transaction:
+                    self._cursor.execute("ROLLBACK")
+                raise
+
+    @contextmanager
+    def _bulk_load(self):
+        """Trade durability for speed while the whole database is rewritten
+
+        Must wrap the transaction, SQLite won't change synchronous inside one. The
+        journal mode is left alone, switching it needs exclusive access.
+        """
+        pragmas = {"synchronous": "OFF"}
+        with self._lock:
+            previous = {name: self._query(f"PRAGMA {name}")[0][0] for name in pragmas}
+            for name, value in pragmas.items():
+                self._execute(f"PRAGMA {name} = {value}")
+            try:
+                yield
+            finally:
+                for name, value in previous.items():
+                    self._execute(f"PRAGMA {name} = {value}")
 
-    def _execute(self, sql: str, parameters: tuple = None, rowid: bool = False):
+    def _query(self, sql: str, parameters: tuple = None):
+        """Run a read and return its rows"""
         if parameters is None:
             parameters = tuple()
-        cur = self.connection.execute(sql, parameters)
-        self.connection.commit()
-        return (cur.lastrowid, cur.fetchall()) if rowid else cur.fetchall()
+        with self._lock:
+            return self._cursor.execute(sql, parameters).fetchall()
+
+    def _execute(self, sql: str, parameters: tuple = None):
+        """Run a write and return the rowid of the last inserted row"""
+        if parameters is None:
+            parameters = tuple()
+        with self._lock:
+            return self._cursor.execute(sql, parameters).lastrowid
 
     def _executemany(self, sql: str, parameters: list[tuple] = None):
         if parameters is None:
             parameters = []
-        result = self.connection.executemany(sql, parameters).fetchall()
-        self.connection.commit()
-        return result
+        with self._lock:
+            self._cursor.executemany(sql, parameters)
 
     def _upload_oldstyle(self, data):
+        # the old format implies these statuses, upload() just emptied Status
+        status_ids = {}
+        for position, (name, orderByPosition) in enumerate(
+            (("Planned", True), ("Done", False), ("Dropped", False)), start=1
+        ):
+            status_ids[name] = self._execute(
+                "INSERT INTO Status VALUES (?,?,?)",
+                (name, position, orderByPosition),
+            )
+
         tbl_pos = 1
         for table, values in data.items():
             if table == "_default":
                 continue
 
-            try:
-                table_id, _ = self._execute(
-                    "INSERT INTO List VALUES (?,?,?)",
-                    (table, tbl_pos, True),
-                    True,
-                )
-                tbl_pos += 1
-
-                statuses = self._execute("SELECT rowid FROM Status")
-                for status in statuses:
-                    try:
-                        self._execute(
-                            "INSERT INTO ListStatus VALUES (?,?)",
-                            (table_id, status["rowid"]),
-                        )
-                    except sqlite3.IntegrityError as e:
-                        pass
-            except sqlite3.IntegrityError:
-                result = self._execute(
-                    "SELECT rowid FROM List WHERE name = ?", (table,)
+            # the names are the keys of a JSON object, so each list is new
+            table_id = self._execute(
+                "INSERT INTO List VALUES (?,?,?)",
+                (table, tbl_pos, True),
+            )
+            tbl_pos += 1
+
+            # SQLite walks the list's entries itself, one statement per list
+            self._execute(
+                """
+                INSERT OR IGNORE INTO Entry(name, position, date, status, list)
+                SELECT
+                    json_extract(value, '$.name'),
+                    CASE WHEN position > 0 THEN position END,
+                    CASE WHEN position <= 0 THEN json_extract(value, '$.date') END,
+                    CASE
+                        WHEN position > 0 THEN ?
+                        WHEN position = 0 THEN ?
+                        WHEN position < 0 THEN ?
+                    END,
+                    ?
+                FROM (
+                    SELECT value, json_extract(value, '$.position') AS position
+                    FROM json_each(?)
                 )
-                table_id = result[0]["rowid"]
-
-            for value in values.values():
-                name = value.get("name")
-                position = value.get("position")
-                date = value.get("date")
-                status = None
-                if position > 0:
-                    result = self._execute(
-                        "SELECT rowid FROM Status WHERE name = 'Planned'"
-                    )
-                    status = result[0]["rowid"]
-                    date = None
-                elif position == 0:
-                    result = self._execute(
-                        "SELECT rowid FROM Status WHERE name = 'Done'"
-                    )
-                    position = None
-                    status = result[0]["rowid"]
-                elif position < 0:
-                    result = self._execute(
-                        "SELECT rowid FROM Status WHERE name = 'Dropped'"
-                    )
-                    position = None
-                    status = result[0]["rowid"]
-                try:
-                    self._execute(
-                        "INSERT INTO Entry VALUES (?, ?, ?, ?, ?)",
-                        (name, position, date, status, table_id),
-                    )
-                except sqlite3.IntegrityError:
-                    pass
+                """,
+                (
+                    status_ids["Planned"],
+                    status_ids["Done"],
+                    status_ids["Dropped"],
+                    table_id,
+                    dumps(values),
+                ),
+            )
+
+        # every list gets every status, the tables were just emptied
+        self._execute(
+            """
+            INSERT OR IGNORE INTO ListStatus(list, status)
+            SELECT List.rowid, Status.rowid
+            FROM List, Status
+            ORDER BY List.rowid, Status.rowid
+            """
+        )
 
     def _upload_newstyle(self, data):
         status = data["Status"]
@@ -217,10 +362,16 @@ class DatabaseSqlite3(Database):
         listStatus = data["ListStatus"]
         entry = data["Entry"]
 
-        status = [(s["rowid"], s["name"], s["rowid"], s["orderByPosition"]) for s in status]
-        table = [(t["rowid"], t["name"], t["position"], t["active"]) for t in table]
-        listStatus = [(l["rowid"], l["list"], l["status"]) for l in listStatus]
-        entry = [(e["rowid"], e["name"], e["position"], e["date"], e["status"], e["list"]) for e in entry]
+        status = (
+            (s["rowid"], s["name"], s.get("position", s["rowid"]), s["orderByPosition"])
+            for s in status
+        )
+        table = ((t["rowid"], t["name"], t["position"], t["active"]) for t in table)
+        listStatus = ((l["rowid"], l["list"], l["status"]) for l in listStatus)
+        entry = (
+            (e["rowid"], e["name"], e["position"], e["date"], e["status"], e["list"])
+            for e in entry
+        )
 
         self._executemany(
             """
@@ -255,83 +406,141 @@ class DatabaseSqlite3(Database):
         )
 
     def upload(self, data):
-        self._drop_database()
-        logging.debug("Loading tables again")
-        self._init_database()
-
-        if data.get("sqlite", False):
-            self._upload_newstyle(data)
-        else:
-            self._upload_oldstyle(data)
+        self._clear_cache()
+        with self._bulk_load(), self._txn():
+            self._drop_database()
+            logging.debug("Loading tables again")
+            self._init_database()
+
+            if data.get("sqlite", False):
+                self._upload_newstyle(data)
+            else:
+                self._upload_oldstyle(data)
+            # dropping the tables threw their statistics away
+            self._execute("ANALYZE")
+
+    def _query_dicts(self, sql: str):
+        """Run a read and return its rows as dicts keyed by column name"""
+        with self._lock:
+            # plain tuples, skip building a Row for each one
+            self._cursor.row_factory = None
+            try:
+                self._cursor.execute(sql)
+                columns = [column[0] for column in self._cursor.description]
+                return [dict(zip(columns, row)) for row in self._cursor]
+            finally:
+                self._cursor.row_factory = self.connection.row_factory
 
     def download(self):
         return {
             "sqlite": True,
-            "Status": [dict(v) for v in self._execute("SELECT rowid, * FROM Status")],
-            "List": [dict(v) for v in self._execute("SELECT rowid, * FROM List")],
-            "ListStatus": [
-                dict(v) for v in self._execute("SELECT rowid, * FROM ListStatus")
-            ],
-            "Entry": [dict(v) for v in self._execute("SELECT rowid, * FROM Entry")],
+            "Status": self._query_dicts("SELECT rowid, * FROM Status"),
+            "List": self._query_dicts("SELECT rowid, * FROM List"),
+            "ListStatus": self._query_dicts("SELECT rowid, * FROM ListStatus"),
+            "Entry": self._query_dicts("SELECT rowid, * FROM Entry"),
         }
 
     def is_table(self, name):
-        return name in [table["name"] for table in self.tables()]
+        return bool(
+            self._query(
+                "SELECT 1 FROM List WHERE active = 1 AND name = ? LIMIT 1", (name,)
+            )
+        )
 
 
     def tables(self):
-        return self._execute(
-            """SELECT rowid, name
-            FROM List
-            WHERE active = 1
-            ORDER BY position ASC"""
-        )
+        if self._tables_cache is None:
+            self._tables_cache = self._query(
+                """SELECT rowid, name
+                FROM List
+                WHERE active = 1
+                ORDER BY position ASC"""
+            )
+        return self._tables_cache
+
+    def refresh(self):
+        """Prepare a pooled connection for the next request
+
+        Drops the caches if another connection committed since the last call
+        and runs PRAGMA optimize every _OPTIMIZE_EVERY checkouts.
+        """
+        version = self._query("PRAGMA data_version")[0][0]
+        if version != self._data_version:
+            self._clear_cache()
+            self._data_version = version
+
+        self._checkouts += 1
+        if self._checkouts % _OPTIMIZE_EVERY == 0:
+            self._execute("PRAGMA optimize")
+
+    def _clear_cache(self):
+        self._tables_cache = None
+        self._status_cache = None
+        self._status_by_id = {}
+        self._table_cache.clear()
 
     def table(self, table: Union[str, int]):
-        sql = f"""SELECT rowid, name
-        FROM List
-        WHERE {"rowid" if isinstance(table, int) else "name"} = ?
-        ORDER BY position ASC"""
-        return self._execute(sql, (table,))[0]
+        if table not in self._table_cache:
+            sql = f"""SELECT rowid, name
+            FROM List
+            WHERE {"rowid" if isinstance(table, int) else "name"} = ?
+            ORDER BY position ASC"""
+            self._table_cache[table] = self._query(sql, (table,))[0]
+        return self._table_cache[table]
 
     def status(self, table: str):
-        return self._execute(
-            """
-            SELECT rowid, *
-            FROM Status
-            ORDER BY position
+        if self._status_cache is None:
+            self._status_cache = self._query(
+                """
+                SELECT rowid, *
+                FROM Status
+                ORDER BY position
+                """
+            )
+            self._status_by_id = {s["rowid"]: s for s in self._status_cache}
+        return self._status_cache
+
+    def _status(self, table: str, status_id: Union[str, int]):
+        """Status row for a form's status id"""
+        self.status(table)
+        return self._status_by_id[int(status_id)]
+
+    def info(self, table: str, limit: int = None):
+        table_id = self.table(table)["rowid"]
+        rows = self._query(
             """
+            SELECT
+                Entry.rowid,
+                Entry.name as name,
+                Entry.position as position,
+                Entry.date as date,
+                List.name as table_name,
+                List.rowid as table_id,
+                Status.name as status_name,
+                Status.rowid as status_id
+            FROM Entry
+            JOIN List
+                ON List.rowid = Entry.list
+            JOIN Status
+                ON Status.rowid = Entry.status
+            WHERE Entry.list = ?
+            ORDER BY Entry.status, Entry.position
+            """,
+            (table_id,),
         )
+        by_status = {
+            status_id: list(result)
+            for status_id, result in groupby(rows, key=itemgetter("status_id"))
+        }
 
-    def info(self, table: str, limit: int = None):
         results = []
         for status in self.status(table):
-            result = self._execute(
-                """
-                SELECT
-                    Entry.rowid,
-                    Entry.name as name,
-                    Entry.position as position,
-                    Entry.date as date,
-                    List.name as table_name,
-                    List.rowid as table_id,
-                    Status.name as status_name,
-                    Status.rowid as status_id
-                FROM Entry
-                JOIN List
-                    ON List.rowid = Entry.list
-                    AND List.name = ?
-                JOIN Status
-                    ON Status.rowid = Entry.status
-                    AND Status.rowid = ?
-                ORDER BY
-                    CASE
-                        WHEN Status.orderByPosition == 1 THEN Entry.position
-                        WHEN Status.orderByPosition == 0 THEN Entry.date
-                    END ASC
-                """,
-                (table, status["rowid"]),
-            )
+            result = by_status.get(status["rowid"], [])
+            if not status["orderByPosition"]:
+                # NULL dates first like SQLite, ties in insertion order
+                result.sort(
+                    key=lambda r: (r["date"] is not None, r["date"] or "", r["rowid"])
+                )
             results.append(
                 {
                     "status": status["name"],
@@ -343,147 +552,60 @@ class DatabaseSqlite3(Database):
         return results
 
     def _increment(self, table_id, status_id, position):
-        self._execute(
-            """
-            UPDATE Entry
-            SET position = position + 1
-            WHERE rowid IN (
-                SELECT Entry.rowid
-                FROM Entry
-                JOIN List
-                    ON List.rowid = Entry.list
-                    AND List.rowid = ?
-                JOIN Status
-                    ON Status.rowid = Entry.status
-                    AND Status.rowid = ?
-                WHERE Entry.position >= ?
-            )
-            """,
-            (table_id, status_id, position),
-        )
+        self._execute(_SQL_INCREMENT, (table_id, status_id, position))
 
     def _decrement(self, table_id, status_id, position):
-        self._execute(
-            """
-            UPDATE Entry
-            SET position = position - 1
-            WHERE rowid IN (
-                SELECT Entry.rowid
-                FROM Entry
-                JOIN List
-                    ON List.rowid = Entry.list
-                    AND List.rowid = ?
-                JOIN Status
-                    ON Status.rowid = Entry.status
-                    AND Status.rowid = ?
-                WHERE Entry.position > ?
-            )
-            """,
-            (table_id, status_id, position),
-        )
-
-    def _increment_range(self, table_id, status_id, greater, lesser):
-        self._execute(
-            """
-            UPDATE Entry
-            SET position = position + 1
-            WHERE rowid IN (
-                SELECT Entry.rowid
-                FROM Entry
-                JOIN List
-                    ON List.rowid = Entry.list
-                    AND List.rowid = ?
-                JOIN Status
-                    ON Status.rowid = Entry.status
-                    AND Status.rowid = ?
-                WHERE Entry.position >= ? AND Entry.position < ?
-            )
-            """,
-            (table_id, status_id, greater, lesser),
-        )
-
-    def _decrement_range(self, table_id, status_id, lesser, greater):
-        self._execute(
-            """
-            UPDATE Entry
-            SET position = position - 1
-            WHERE rowid IN (
-                SELECT Entry.rowid
-                FROM Entry
-                JOIN List
-                    ON List.rowid = Entry.list
-                    AND List.rowid = ?
-                JOIN Status
-                    ON Status.rowid = Entry.status
-                    AND Status.rowid = ?
-                WHERE Entry.position <= ? AND Entry.position > ?
-            )
-            """,
-            (table_id, status_id, lesser, greater),
-        )
+        self._execute(_SQL_DECREMENT, (table_id, status_id, position))
 
     def _calc_position(self, table_id, status_id, position):
-        try:
-            max_pos = self._execute(
-                """
-                SELECT MAX(Entry.position)
-                FROM Entry
-                JOIN List
-                    ON List.rowid = Entry.list
-                    AND List.rowid = ?
-                JOIN Status
-                    ON Status.rowid = Entry.status
-                    AND Status.rowid = ?
-                """,
-                (table_id, status_id),
-            )[0][0]
-            if max_pos is None:
-                max_pos = 0
-        except IndexError:
-            max_pos = 0
-        pos = max(1, int(position if (position not in ("", "None", None)) else maxsize))
+        max_pos = self._query(_SQL_CALC_POS, (table_id, status_id))[0][0]
+        pos = self._requested_position(position)
         res = pos if (pos <= max_pos) else (max_pos + 1)
         return res, max_pos
 
-    def insert(self, form, table):
-        status = [s for s in self.status(table) if s["rowid"] == int(form["status"])][0]
-        status_id = status["rowid"]
-        orderByPosition = status["orderByPosition"]
-        table_id = self.table(table)["rowid"]
-        name = form["name"].strip()
-        date = None
-        position = None
+    @staticmethod
+    def _requested_position(position):
+        if position in ("", "None", None):
+            position = maxsize
+        return max(1, int(position))
 
-        if orderByPosition:
-            position, max_pos = self._calc_position(
-                table_id, status_id, form["position"]
-            )
-            if position <= max_pos:
+    def insert(self, form, table):
+        with self._txn():
+            status = self._status(table, form["status"])
+            status_id = status["rowid"]
+            orderByPosition = status["orderByPosition"]
+            table_id = self.table(table)["rowid"]
+            name = form["name"].strip()
+            date = None
+            position = None
+
+            if orderByPosition:
+                # a position past the end shifts nothing and the INSERT below
+                # clamps it to the end of the list
+                position = self._requested_position(form["position"])
                 self._increment(table_id, status_id, position)
-        else:
-            if form.get("date", "") == "":
-                date = datetime.now().strftime("%Y-%m-%d")
             else:
-                date = form["date"]
+                if form.get("date", "") == "":
+                    date = datetime.now().strftime("%Y-%m-%d")
+                else:
+                    date = form["date"]
 
-        self._execute(
-            """
-            INSERT INTO Entry
-            VALUES (?,?,?,?,?)
-            """,
-            (name, position, date, status_id, table_id),
-        )
+            self._execute(
+                _SQL_INSERT_ENTRY,
+                (name, position, date, status_id, table_id, table_id, status_id),
+            )
 
     def update(self, form, table):
-        statuses = self.status(table)
         old_table = self.table(table)
         table_id = old_table["rowid"]
 
         rowid = int(form["rowid"])
         new_table = self.table(int(form["table"]))
-        old_status = [s for s in statuses if s["rowid"] == int(form["old_status"])][0]
-        new_status = [s for s in statuses if s["rowid"] == int(form["status"])][0]
-        old_pos = int(form["old_pos"]) if form["old_pos"] not in ("None", "") else None
+        old_status = self._status(table, form["old_status"])
+        new_status = self._status(table, form["status"])
+        old_pos = (
+            int(form["old_pos"]) if form["old_pos"] not in ("None", "") else None
+        )
         new_pos = int(form["pos"]) if form["pos"] not in ("None", "") else None
         old_name = form["old_name"].strip()
         new_name = form["name"].strip()
@@ -492,6 +614,7 @@ class DatabaseSqlite3(Database):
 
         goto = new_table["name"]
 
+        # a save without edits returns before taking the write lock
         if (
             old_table == new_table
             and old_status == new_status
@@ -501,99 +624,93 @@ class DatabaseSqlite3(Database):
         ):
             return goto
 
-        if old_table != new_table or old_status != new_status:
-            self.insert(
-                {
-                    "position": new_pos,
-                    "name": new_name,
-                    "status": new_status["rowid"],
-                    "date": new_date,
-                },
-                new_table["name"],
-            )
-            self.delete(
-                {
-                    "rowid": rowid,
-                    "name": old_name,
-                }
+        with self._txn():
+            if old_table != new_table or old_status != new_status:
+                self.insert(
+                    {
+                        "position": new_pos,
+                        "name": new_name,
+                        "status": new_status["rowid"],
+                        "date": new_date,
+                    },
+                    new_table["name"],
+                )
+                self.delete(
+                    {
+                        "rowid": rowid,
+                        "name": old_name,
+                    }
+                )
+                return goto
+
+            status_id = new_status["rowid"]
+            old_pos, _ = self._calc_position(table_id, status_id, old_pos)
+            new_pos, max_pos = self._calc_position(table_id, status_id, new_pos)
+            if new_pos > max_pos:
+                new_pos = max_pos
+
+            if old_pos == new_pos and old_name == new_name and old_date == new_date:
+                return goto
+
+            # entries between the old and new position shift one towards the
+            # old position, in the same statement that moves this entry
+            delta = (old_pos > new_pos) - (old_pos < new_pos)
+            lower, upper = (
+                sorted((new_pos, old_pos - delta)) if delta else (None, None)
             )
-            return goto
-
-        status_id = new_status["rowid"]
-        old_pos, _ = self._calc_position(table_id, status_id, old_pos)
-        new_pos, max_pos = self._calc_position(table_id, status_id, new_pos)
-        if new_pos > max_pos:
-            new_pos = max_pos
-
-        if old_pos > new_pos:
-            self._increment_range(table_id, status_id, new_pos, old_pos)
-        elif old_pos < new_pos:
-            self._decrement_range(table_id, status_id, new_pos, old_pos)
-        if old_pos != new_pos or old_name != new_name or old_date != new_date:
             self._execute(
-                """
-                UPDATE Entry
-                SET position = ?, name = ?, date = ?
-                WHERE rowid = ?
-                """,
-                (new_pos, new_name, new_date, rowid),
+                _SQL_UPDATE_ENTRY,
+                (
+                    rowid,
+                    new_pos,
+                    delta,
+                    rowid,
+                    new_name,
+                    rowid,
+                    new_date,
+                    rowid,
+                    table_id,
+                    status_id,
+                    lower,
+                    upper,
+                ),
             )
-        return goto
+            return goto
 
     def delete(self, form):
-        rowid = int(form["rowid"])
-        name = form["name"].strip()
+        with self._txn():
+            rowid = int(form["rowid"])
+            name = form["name"].strip()
 
-        value = self._execute(
-            """SELECT
-                Entry.name as name,
-                Entry.position as position,
-                Status.orderByPosition as orderByPosition,
-                List.rowid as table_id,
-                Status.rowid as status_id
-            FROM Entry
-            JOIN List ON List.rowid = Entry.list
-            JOIN Status ON Status.rowid = Entry.status
-            WHERE Entry.rowid = ?
-            """,
-            (rowid,),
-        )[0]
+            value = self._query(
+                """SELECT
+                    Entry.name as name,
+                    Entry.position as position,
+                    Status.orderByPosition as orderByPosition,
+                    List.rowid as table_id,
+                    Status.rowid as status_id
+                FROM Entry
+                JOIN List ON List.rowid = Entry.list
+                JOIN Status ON Status.rowid = Entry.status
+                WHERE Entry.rowid = ?
+                """,
+                (rowid,),
+            )[0]
 
-        if value["name"] == name:
-            self._decrement(value["table_id"], value["status_id"], value["position"])
-            self._execute("DELETE FROM Entry WHERE rowid = ?", (rowid,))
+            if value["name"] == name:
+                self._decrement(
+                    value["table_id"], value["status_id"], value["position"]
+                )
+                self._execute("DELETE FROM Entry WHERE rowid = ?", (rowid,))
 
     def get_settings(self):
-        statuses = self._execute("SELECT rowid, * FROM Status")
-        tables = self._execute("SELECT rowid, * FROM List")
-        enabledStatuses = self._execute(
-            """
-            SELECT
-                Status.position as position,
-                List.rowid as table_id,
-                Status.rowid as status_id,
-                Status.orderByPosition as orderByPosition
-            FROM ListStatus
-            JOIN List ON List.rowid = ListStatus.list
-            JOIN Status ON Status.rowid = ListStatus.status
-            """
-        )
-
-        statusList = []
-        for status in statuses:
-            statusList.append(dict(status))
-        statusList = sorted(statusList, key=lambda i: i["position"])
-
-        tableDict = {}
-        for table in tables:
-            table = dict(table)
-            tableDict[table["rowid"]] = table
-
-        tableList = sorted(tableDict.values(), key=lambda i: i["position"])
-
         return {
-            "statuses": statusList,
-            "tables": tableList,
+            "statuses": self._query_dicts(
+                "SELECT rowid, * FROM Status ORDER BY position, rowid"
+            ),
+            "tables": self._query_dicts(
+                "SELECT rowid, * FROM List ORDER BY position, rowid"
+            ),
         }
 
     def set_settings(self, form):
@@ -602,7 +719,7 @@ class DatabaseSqlite3(Database):
         numStatuses = int(form["numStatuses"])
         numTables = int(form["numTables"])
 
-        statuses = []
+        statusUpdate, statusInsert = [], []
         for idx, og in enumerate(statusOrder):
             pre = f"status_{og}"
             name = form[f"{pre}_name"]
@@ -613,41 +730,13 @@ class DatabaseSqlite3(Database):
                 order = form.get(f"{pre}_orderByPosition") == "on"
                 og_order = form.get(f"{pre}_og_orderByPosition") == "on"
                 if name != og_name or pos != og_pos or order != og_order:
-                    statuses.append(
-                        {
-                            "rowid": og if og <= numStatuses else 0,
-                            "name": name,
-                            "position": pos,
-                            "orderByPosition": order,
-                        }
-                    )
-
-        statusUpdate, statusInsert = partition(lambda i: i["rowid"] == 0, statuses)
-        statusUpdate = [(s["name"], s["position"], s["orderByPosition"], s["rowid"]) for s in statusUpdate]
-        statusInsert = [
-            (s["name"], s["position"], s["orderByPosition"]) for s in statusInsert
-        ]
-
-        if statusUpdate:
-            self._executemany(
-                """
-                UPDATE Status
-                SET name = ?, position = ?, orderByPosition = ?
-                WHERE rowid = ?
-                """,
-                statusUpdate,
-            )
-
-        if statusInsert:
-            self._executemany(
-                """
-                INSERT INTO Status(name, position, orderByPosition)
-                VALUES (?, ?, ?)
-                """,
-                statusInsert,
-            )
+                    rowid = og if og <= numStatuses else 0
+                    if rowid:
+                        statusUpdate.append((name, pos, order, rowid))
+                    else:
+                        statusInsert.append((name, pos, order))
 
-        tables = []
+        tableUpdate, tableInsert = [], []
         for idx, og in enumerate(tableOrder):
             pre = f"table_{og}"
             name = form[f"{pre}_name"]
@@ -656,41 +745,14 @@ class DatabaseSqlite3(Database):
                 pos = idx + 1
                 og_pos = int(form.get(f"{pre}_og_position", 0))
                 if name != og_name or pos != og_pos:
-                    tables.append(
-                        {
-                            "rowid": og if og <= numTables else 0,
-                            "name": name,
-                            "active": form.get(f"{pre}_active") == "on",
-                            "position": pos
-                        }
-                    )
-
-        tableUpdate, tableInsert = partition(lambda i: i["rowid"] == 0, tables)
-        tableUpdate = [
-            (t["name"], t["position"], t["active"], t["rowid"]) for t in tableUpdate
-        ]
-        tableInsert = [(t["name"], t["position"], t["active"]) for t in tableInsert]
-
-        if tableUpdate:
-            self._executemany(
-                """
-                UPDATE List
-                SET name = ?, position = ?, active = ?
-                WHERE rowid = ?
-                """,
-                tableUpdate,
-            )
-
-        if tableInsert:
-            self._executemany(
-                """
-                INSERT INTO List(name, position, active)
-                VALUES (?, ?, ?)
-                """,
-                tableInsert,
-            )
-
-        return {
+                    rowid = og if og <= numTables else 0
+                    active = form.get(f"{pre}_active") == "on"
+                    if rowid:
+                        tableUpdate.append((name, pos, active, rowid))
+                    else:
+                        tableInsert.append((name, pos, active))
+
+        changes = {
             "statuses": {
                 "update": statusUpdate,
                 "insert": statusInsert,
@@ -700,4 +762,47 @@ class DatabaseSqlite3(Database):
                 "insert": tableInsert,
             },
         }
+        if not (statusUpdate or statusInsert or tableUpdate or tableInsert):
+            return changes
+
+        self._clear_cache()
+        with self._txn():
+            if statusUpdate:
+                self._executemany(
+                    """
+                    UPDATE Status
+                    SET name = ?, position = ?, orderByPosition = ?
+                    WHERE rowid = ?
+                    """,
+                    statusUpdate,
+                )
+
+            if statusInsert:
+                self._executemany(
+                    """
+                    INSERT INTO Status(name, position, orderByPosition)
+                    VALUES (?, ?, ?)
+                    """,
+                    statusInsert,
+                )
+
+            if tableUpdate:
+                self._executemany(
+                    """
+                    UPDATE List
+                    SET name = ?, position = ?, active = ?
+                    WHERE rowid = ?
+                    """,
+                    tableUpdate,
+                )
+
+            if tableInsert:
+                self._executemany(
+                    """
+                    INSERT INTO List(name, position, active)
+                    VALUES (?, ?, ?)
+                    """,
+                    tableInsert,
+                )
 
+        return changes